@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for the interop tests
+"""
+
+import os
+import subprocess
+import pytest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+EXAMPLES_DIR = REPO_ROOT / "target" / "debug" / "examples"
+
+# Monocoque examples the tests drive from target/debug/examples. They need the
+# `zmq` feature, which `cargo run --example` would not pass.
+INTEROP_EXAMPLES = [
+    "simple_rep_server",
+    "simple_req_client",
+    "sub_client",
+    "pub_server",
+]
+
+# Everything the example binaries are built from
+SOURCE_PATHS = [
+    REPO_ROOT / "Cargo.toml",
+    REPO_ROOT / "Cargo.lock",
+    REPO_ROOT / "monocoque-core",
+    REPO_ROOT / "monocoque-zmtp",
+    REPO_ROOT / "monocoque",
+]
+
+
+def newest_source_mtime():
+    """Latest modification time across the crates' manifests and sources"""
+    newest = 0.0
+    for path in SOURCE_PATHS:
+        if path.is_file():
+            newest = max(newest, path.stat().st_mtime)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if d != "target"]
+            for name in filenames:
+                if name.endswith(".rs") or name == "Cargo.toml":
+                    newest = max(newest, os.stat(os.path.join(dirpath, name)).st_mtime)
+    return newest
+
+
+def examples_up_to_date():
+    """True if every interop example exists and is newer than its sources"""
+    binaries = [EXAMPLES_DIR / example for example in INTEROP_EXAMPLES]
+    if not all(binary.is_file() for binary in binaries):
+        return False
+    oldest_binary = min(binary.stat().st_mtime for binary in binaries)
+    return oldest_binary >= newest_source_mtime()
+
+
+@pytest.fixture(scope="session")
+def build_examples():
+    """Build the interop examples once per session, unless they are already fresh
+
+    Requested only by the modules that drive these binaries, so the other
+    scripts here do not need cargo. When CI has prebuilt the examples this
+    skips cargo entirely, keeping the build out of the first test's timeout.
+    """
+    if examples_up_to_date():
+        return
+    cmd = ["cargo", "build", "--quiet", "-p", "monocoque-rs", "--features", "zmq"]
+    for example in INTEROP_EXAMPLES:
+        cmd += ["--example", example]
+    subprocess.run(cmd, check=True, cwd=REPO_ROOT)
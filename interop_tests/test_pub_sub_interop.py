@@ -10,12 +10,16 @@ import subprocess
 import signal
 from pathlib import Path
 
-# The examples are prebuilt (debug) by CI with the `zmq` feature; drive the
-# binaries directly rather than `cargo run`, which would not pass the feature.
+# The examples are built once per session (debug, with the `zmq` feature) by
+# the `build_examples` fixture in conftest.py; drive the binaries directly
+# rather than paying for `cargo run` on every test.
 CARGO_BIN = Path(__file__).parent.parent / "target" / "debug"
 SUB_CLIENT = str(CARGO_BIN / "examples" / "sub_client")
 PUB_SERVER = str(CARGO_BIN / "examples" / "pub_server")
 
+# Build the Monocoque examples (see conftest.py) before any test in this module
+pytestmark = pytest.mark.usefixtures("build_examples")
+
 
 def test_libzmq_pub_to_monocoque_sub():
     """Test libzmq PUB → Monocoque SUB"""
@@ -10,11 +10,20 @@ import pytest
 import time
 import subprocess
 import signal
+import select
 import os
 from pathlib import Path
+from socket import create_server
 
 CARGO_BIN = Path(__file__).parent.parent / "target" / "debug"
 
+# simple_rep_server serves a single connection, so every test that talks to it
+# needs its own server; one port per such test.
+SERVER_PORTS = [15555, 15557, 15558, 15559]
+
+# Build the Monocoque examples (see conftest.py) before any test in this module
+pytestmark = pytest.mark.usefixtures("build_examples")
+
 
 class MonocoqueServer:
     """Manage Monocoque REP server subprocess"""
@@ -24,7 +33,12 @@ class MonocoqueServer:
         self.process = None
     
     def start(self):
-        """Start Monocoque REP server"""
+        """Start Monocoque REP server and wait for it to bind"""
+        self.spawn()
+        self.wait_ready()
+    
+    def spawn(self):
+        """Launch the server process without waiting for it to bind"""
         # Use the pre-built binary instead of cargo run
         binary = CARGO_BIN / "examples" / "simple_rep_server"
         cmd = [
@@ -35,9 +49,27 @@ class MonocoqueServer:
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            cwd=Path(__file__).parent.parent
+            cwd=Path(__file__).parent.parent,
+            bufsize=0,  # unbuffered, so select() sees every pending line
         )
-        time.sleep(1)  # Wait for server to bind
+    
+    def wait_ready(self, timeout=2.0):
+        """Wait until the server reports that it is listening
+        
+        Probing the port with a TCP connect would use up the server's single
+        accept, so watch its stdout for the line it prints after binding.
+        """
+        deadline = time.monotonic() + timeout
+        stdout = self.process.stdout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                raise TimeoutError(f"REP server on port {self.port} did not bind within {timeout}s")
+            line = stdout.readline()
+            if not line:
+                raise RuntimeError(f"REP server on port {self.port} exited before binding")
+            if b"listening on" in line:
+                return
     
     def stop(self):
         """Stop server"""
@@ -46,30 +78,56 @@ class MonocoqueServer:
             self.process.wait(timeout=5)
 
 
-def test_libzmq_req_to_monocoque_rep():
+def free_port():
+    """Ask the OS for a currently unused TCP port"""
+    with create_server(("127.0.0.1", 0)) as probe:
+        return probe.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def server_pool(build_examples):
+    """Spawn all Monocoque REP servers up front so their startup overlaps"""
+    servers = [MonocoqueServer(port=port) for port in SERVER_PORTS]
+    for server in servers:
+        server.spawn()
+    for server in servers:
+        server.wait_ready()
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def server(server_pool):
+    """Hand a test its own running Monocoque REP server"""
+    if server_pool:
+        server = server_pool.pop()
+    else:
+        # Pool used up (more tests than SERVER_PORTS, or a rerun)
+        server = MonocoqueServer(port=free_port())
+        server.start()
+    yield server
+    server.stop()
+
+
+def test_libzmq_req_to_monocoque_rep(server):
     """Test libzmq REQ client → Monocoque REP server"""
     
-    server = MonocoqueServer(port=15555)
-    server.start()
+    # Create libzmq REQ client
+    ctx = zmq.Context()
+    socket = ctx.socket(zmq.REQ)
+    socket.connect(f"tcp://127.0.0.1:{server.port}")
     
-    try:
-        # Create libzmq REQ client
-        ctx = zmq.Context()
-        socket = ctx.socket(zmq.REQ)
-        socket.connect("tcp://127.0.0.1:15555")
-        
-        # Send request
-        socket.send(b"Hello from libzmq")
-        
-        # Receive reply
-        reply = socket.recv()
-        
-        assert reply == b"Echo: Hello from libzmq"
-        
-        socket.close()
-        ctx.term()
-    finally:
-        server.stop()
+    # Send request
+    socket.send(b"Hello from libzmq")
+    
+    # Receive reply
+    reply = socket.recv()
+    
+    assert reply == b"Echo: Hello from libzmq"
+    
+    socket.close()
+    ctx.term()
 
 
 def test_monocoque_req_to_libzmq_rep():
@@ -108,85 +166,68 @@ def test_monocoque_req_to_libzmq_rep():
             client.kill()
 
 
-def test_multipart_message_req_rep():
+def test_multipart_message_req_rep(server):
     """Test multipart message handling"""
     
-    server = MonocoqueServer(port=15557)
-    server.start()
+    ctx = zmq.Context()
+    socket = ctx.socket(zmq.REQ)
+    socket.connect(f"tcp://127.0.0.1:{server.port}")
     
-    try:
-        ctx = zmq.Context()
-        socket = ctx.socket(zmq.REQ)
-        socket.connect("tcp://127.0.0.1:15557")
-        
-        # Send multipart request
-        socket.send_multipart([b"frame1", b"frame2", b"frame3"])
-        
-        # Receive multipart reply
-        reply = socket.recv_multipart()
-        
-        assert len(reply) == 3
-        assert reply[0] == b"Echo: frame1"
-        assert reply[1] == b"frame2"
-        assert reply[2] == b"frame3"
-        
-        socket.close()
-        ctx.term()
-    finally:
-        server.stop()
+    # Send multipart request as zero-copy frames
+    frames = [zmq.Frame(f) for f in (b"frame1", b"frame2", b"frame3")]
+    socket.send_multipart(frames, copy=False, track=False)
+    
+    # Receive multipart reply
+    reply = socket.recv_multipart(copy=False)
+    
+    assert len(reply) == 3
+    assert reply[0].bytes == b"Echo: frame1"
+    assert reply[1].bytes == b"frame2"
+    assert reply[2].bytes == b"frame3"
+    
+    socket.close()
+    ctx.term()
 
 
-def test_multiple_request_cycles():
+def test_multiple_request_cycles(server):
     """Test multiple request/reply cycles"""
     
-    server = MonocoqueServer(port=15558)
-    server.start()
+    ctx = zmq.Context()
+    socket = ctx.socket(zmq.REQ)
+    socket.connect(f"tcp://127.0.0.1:{server.port}")
     
-    try:
-        ctx = zmq.Context()
-        socket = ctx.socket(zmq.REQ)
-        socket.connect("tcp://127.0.0.1:15558")
-        
-        # Perform 10 request/reply cycles
-        for i in range(10):
-            msg = f"Request {i}".encode()
-            socket.send(msg)
-            reply = socket.recv()
-            expected = f"Echo: Request {i}".encode()
-            assert reply == expected, f"Cycle {i} failed"
-        
-        socket.close()
-        ctx.term()
-    finally:
-        server.stop()
+    # Perform 10 request/reply cycles
+    for i in range(10):
+        msg = f"Request {i}".encode()
+        socket.send(msg)
+        reply = socket.recv()
+        expected = f"Echo: Request {i}".encode()
+        assert reply == expected, f"Cycle {i} failed"
+    
+    socket.close()
+    ctx.term()
 
 
-def test_large_message_req_rep():
+def test_large_message_req_rep(server):
     """Test large message handling (1MB)"""
     
-    server = MonocoqueServer(port=15559)
-    server.start()
+    ctx = zmq.Context()
+    socket = ctx.socket(zmq.REQ)
+    socket.connect(f"tcp://127.0.0.1:{server.port}")
     
-    try:
-        ctx = zmq.Context()
-        socket = ctx.socket(zmq.REQ)
-        socket.connect("tcp://127.0.0.1:15559")
-        
-        # Send 1MB message
-        large_msg = b"X" * (1024 * 1024)
-        socket.send(large_msg)
-        
-        # Receive reply
-        reply = socket.recv()
-        
-        # Server should echo back with "Echo: " prefix
-        assert reply.startswith(b"Echo: ")
-        assert len(reply) == len(large_msg) + 6
-        
-        socket.close()
-        ctx.term()
-    finally:
-        server.stop()
+    # Send 1MB message
+    large_msg = b"X" * (1024 * 1024)
+    socket.send(large_msg)
+    
+    # Receive reply
+    reply = socket.recv()
+    
+    # Server should echo back with "Echo: " prefix
+    assert reply.startswith(b"Echo: ")
+    assert len(reply) == len(large_msg) + 6
+    
+    socket.close()
+    ctx.term()
 
 
 if __name__ == "__main__":
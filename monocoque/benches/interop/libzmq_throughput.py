@@ -4,117 +4,284 @@ libzmq Throughput Benchmark
 
 Measures messages/second for REQ/REP pattern using libzmq.
 Results can be compared with Monocoque benchmarks.
+
+The pyzmq runs include Python and pyzmq overhead. For a libzmq-only REQ/REP
+baseline the script also drives libzmq's perf/local_lat and perf/remote_lat
+tools when they are on PATH or in $LIBZMQ_PERF_DIR.
 """
 
 import zmq
+import os
+import re
+import shutil
+import socket
+import subprocess
 import time
 import sys
 import statistics
+import threading
+
+
+# Kernel socket buffer size for the REQ/REP sockets, large enough that the
+# biggest payloads are never throttled by the default buffers.
+SOCKET_BUFFER_SIZE = 4 << 20
+
+# Payload size from which the benchmarks send (and REQ/REP receives) zero-copy
+# Frames. Below it, Frame bookkeeping costs more than the memcpy it saves, and
+# Frame(data) copies anyway (same as pyzmq's default copy_threshold).
+ZERO_COPY_THRESHOLD = 64 * 1024
+
+# Cores for the benchmark process and the libzmq IO thread. Adjacent cores so
+# they share a cache; for the steadiest numbers isolate them from the
+# scheduler with the `isolcpus=` kernel boot argument.
+BENCH_CPU = 2
+IO_THREAD_CPU = 3
+
+# How long the PUB/SUB consumer waits for a message before giving up, so a
+# failed producer ends the run instead of hanging it.
+RECV_TIMEOUT_MS = 5000
+
+# Ceiling for one local_lat/remote_lat run. If local_lat never binds (e.g. its
+# port was taken), remote_lat would otherwise block forever in REQ recv.
+NATIVE_TIMEOUT_S = 60
+
+
+def tune_socket(sock):
+    """Apply the benchmark's TCP tuning to a socket before bind/connect.
+
+    libzmq always sets TCP_NODELAY on its TCP connections, so only the
+    kernel buffers and IMMEDIATE (queue only on completed connections)
+    need to be set here.
+    """
+    sock.setsockopt(zmq.SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(zmq.RCVBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(zmq.IMMEDIATE, 1)
+
+
+def pin_cpus(ctx):
+    """Pin this process and the context's IO thread to their cores.
 
+    Returns the previous CPU mask, so the caller can unpin again, or None if
+    pinning was skipped: CPU affinity unsupported, the cores not available to
+    this process, or a libzmq without THREAD_AFFINITY_CPU_ADD (< 4.3). Must
+    run before the context creates its first socket, since that is when the
+    IO thread starts.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    original = os.sched_getaffinity(0)
+    if not {BENCH_CPU, IO_THREAD_CPU} <= original:
+        return None
+    # Set the context option (zmq_ctx_set; ctx.setsockopt would only store a
+    # socket default) before pinning, so an old libzmq leaves us unpinned
+    try:
+        ctx.set(zmq.THREAD_AFFINITY_CPU_ADD, IO_THREAD_CPU)
+    except (AttributeError, zmq.ZMQError):
+        return None
+    os.sched_setaffinity(0, {BENCH_CPU})
+    return original
 
-def bench_req_rep_throughput(message_size: int, num_messages: int = 10000):
+
+def bench_req_rep_throughput(message_size: int, num_messages: int = 10000, ctx=None):
     """Benchmark REQ/REP throughput"""
     
-    ctx = zmq.Context()
+    ctx = ctx or zmq.Context.instance()
     
     # Create REP server
     rep = ctx.socket(zmq.REP)
+    tune_socket(rep)
     rep.bind("tcp://127.0.0.1:0")
     endpoint = rep.getsockopt(zmq.LAST_ENDPOINT).decode()
     port = int(endpoint.split(":")[-1])
     
     # Create REQ client
     req = ctx.socket(zmq.REQ)
+    tune_socket(req)
     req.connect(f"tcp://127.0.0.1:{port}")
     
-    # Prepare message
+    # Prepare message. Large payloads are wrapped once in a Frame so that
+    # copy=False hands libzmq the same buffer each time; small ones are faster
+    # as plain bytes.
     msg = b"X" * message_size
+    copy = message_size < ZERO_COPY_THRESHOLD
+    payload = msg if copy else zmq.Frame(msg)
+    
+    req_send, req_recv = req.send, req.recv
+    rep_send, rep_recv = rep.send, rep.recv
     
     # Warm-up
     for _ in range(100):
-        req.send(msg)
-        rep.recv()
-        rep.send(msg)
-        req.recv()
+        req_send(payload, copy=copy, track=False)
+        rep_recv(copy=copy)
+        rep_send(payload, copy=copy, track=False)
+        req_recv(copy=copy)
     
     # Benchmark
-    start = time.time()
+    start = time.perf_counter_ns()
     
     for _ in range(num_messages):
-        req.send(msg)
-        rep.recv()
-        rep.send(msg)
-        req.recv()
+        req_send(payload, copy=copy, track=False)
+        rep_recv(copy=copy)
+        rep_send(payload, copy=copy, track=False)
+        req_recv(copy=copy)
     
-    elapsed = time.time() - start
+    elapsed_ns = time.perf_counter_ns() - start
     
     # Calculate metrics
+    elapsed = elapsed_ns / 1e9
     throughput = num_messages / elapsed
-    latency_us = (elapsed / num_messages) * 1_000_000
+    latency_ns = elapsed_ns // num_messages
     
     req.close()
     rep.close()
-    ctx.term()
     
     return {
         "throughput": throughput,
-        "latency_us": latency_us,
+        "latency_ns": latency_ns,
+        "latency_us": latency_ns / 1000,
         "elapsed": elapsed,
         "num_messages": num_messages
     }
 
 
-def bench_pub_sub_throughput(message_size: int, num_messages: int = 100000):
+def find_perf_tool(name: str):
+    """Locate one of libzmq's perf/ binaries (local_lat, remote_lat, ...)
+
+    Looks in $LIBZMQ_PERF_DIR first, then on PATH. Returns None if missing.
+    """
+    perf_dir = os.environ.get("LIBZMQ_PERF_DIR")
+    if perf_dir:
+        candidate = os.path.join(perf_dir, name)
+        if os.access(candidate, os.X_OK):
+            return candidate
+    return shutil.which(name)
+
+
+def bench_req_rep_throughput_native(message_size: int, num_messages: int = 10000):
+    """Benchmark REQ/REP with libzmq's own local_lat/remote_lat tools
+
+    Unlike bench_req_rep_throughput this measures libzmq alone, with no
+    Python in the loop, so it is the fair baseline for Monocoque's native
+    benchmarks. Returns None if the tools are not installed; raises
+    CalledProcessError or TimeoutExpired if a run fails.
+    """
+    local_lat = find_perf_tool("local_lat")
+    remote_lat = find_perf_tool("remote_lat")
+    if not local_lat or not remote_lat:
+        return None
+    
+    # Reserve a free port for local_lat to bind
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    
+    args = [str(message_size), str(num_messages)]
+    server = subprocess.Popen(
+        [local_lat, f"tcp://127.0.0.1:{port}", *args],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        client = subprocess.run(
+            [remote_lat, f"tcp://127.0.0.1:{port}", *args],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=NATIVE_TIMEOUT_S,
+        )
+        server.wait(timeout=10)
+    finally:
+        if server.poll() is None:
+            server.kill()
+    
+    # remote_lat reports one-way latency: half the measured roundtrip time
+    match = re.search(r"average latency: ([\d.]+) \[us\]", client.stdout)
+    if not match:
+        raise RuntimeError(f"unexpected remote_lat output: {client.stdout!r}")
+    roundtrip_us = float(match.group(1)) * 2
+    
+    return {
+        "throughput": 1_000_000 / roundtrip_us,
+        "latency_us": roundtrip_us,
+        "elapsed": roundtrip_us * num_messages / 1_000_000,
+        "num_messages": num_messages
+    }
+
+
+def bench_pub_sub_throughput(message_size: int, num_messages: int = 100000, ctx=None):
     """Benchmark PUB/SUB throughput"""
     
-    ctx = zmq.Context()
+    ctx = ctx or zmq.Context.instance()
     
-    # Create PUB server
-    pub = ctx.socket(zmq.PUB)
+    # Create PUB server. XPUB hands us the subscription message, which is how
+    # we know the subscriber is attached. The HWMs are raised to the message
+    # count so a burst from the producer is queued instead of dropped.
+    pub = ctx.socket(zmq.XPUB)
+    pub.setsockopt(zmq.XPUB_VERBOSE, 1)
+    pub.setsockopt(zmq.SNDHWM, num_messages)
     pub.bind("tcp://127.0.0.1:0")
     endpoint = pub.getsockopt(zmq.LAST_ENDPOINT).decode()
     port = int(endpoint.split(":")[-1])
     
     # Create SUB client
     sub = ctx.socket(zmq.SUB)
+    sub.setsockopt(zmq.RCVHWM, num_messages)
+    sub.setsockopt(zmq.RCVTIMEO, RECV_TIMEOUT_MS)
     sub.connect(f"tcp://127.0.0.1:{port}")
     sub.setsockopt(zmq.SUBSCRIBE, b"")
     
-    # Allow subscription to propagate
-    time.sleep(0.5)
+    # Wait for the subscription to reach the publisher
+    pub.recv()
     
-    # Prepare message
+    # Prepare message; as for REQ/REP, only large payloads go out as Frames
     msg = b"X" * message_size
+    copy = message_size < ZERO_COPY_THRESHOLD
+    payload = msg if copy else zmq.Frame(msg)
     
-    # Benchmark - send all messages
-    start = time.time()
-    
-    for _ in range(num_messages):
-        pub.send(msg, zmq.NOBLOCK)
+    # Benchmark - a producer thread sends while this thread receives, so the
+    # pipe is kept full instead of measuring a send burst and then a drain.
+    # The PUB socket is only touched by the producer from here on.
+    send_elapsed_ns = [0]
+    producer_error = [None]
     
-    send_elapsed = time.time() - start
+    def producer():
+        try:
+            pub_send = pub.send
+            send_start = time.perf_counter_ns()
+            for _ in range(num_messages):
+                pub_send(payload, copy=copy, track=False)
+            send_elapsed_ns[0] = time.perf_counter_ns() - send_start
+        except Exception as exc:
+            producer_error[0] = exc
     
-    # Receive all messages
-    recv_start = time.time()
+    sub_recv = sub.recv
+    thread = threading.Thread(target=producer)
     received = 0
     
-    while received < num_messages:
-        try:
-            sub.recv(zmq.NOBLOCK)
-            received += 1
-        except zmq.Again:
-            time.sleep(0.001)
+    start = time.perf_counter_ns()
+    thread.start()
+    
+    try:
+        for received in range(1, num_messages + 1):
+            sub_recv()
+    except zmq.Again:
+        received -= 1  # the last recv timed out
     
-    recv_elapsed = time.time() - recv_start
+    recv_elapsed = (time.perf_counter_ns() - start) / 1e9
+    thread.join()
+    send_elapsed = send_elapsed_ns[0] / 1e9
     
-    pub.close()
+    pub.close(linger=0)
     sub.close()
-    ctx.term()
+    
+    if producer_error[0] is not None:
+        raise RuntimeError("PUB/SUB producer failed") from producer_error[0]
+    if received < num_messages:
+        raise RuntimeError(f"PUB/SUB received {received} of {num_messages} messages")
     
     return {
         "send_throughput": num_messages / send_elapsed,
         "recv_throughput": num_messages / recv_elapsed,
-        "total_elapsed": send_elapsed + recv_elapsed
+        "total_elapsed": recv_elapsed
     }
 
 
@@ -123,12 +290,44 @@ def main():
     print("libzmq Throughput Benchmark")
     print("=" * 60)
     
+    # One context (and IO thread) shared by every run; each run only opens
+    # and closes its own sockets.
+    ctx = zmq.Context(io_threads=1)
+    original_cpus = pin_cpus(ctx)
+    if original_cpus is not None:
+        print(f"Pinned to CPU {BENCH_CPU}, IO thread to CPU {IO_THREAD_CPU}")
+    
     # REQ/REP benchmarks
-    print("\nREQ/REP Pattern:")
+    print("\nREQ/REP Pattern (pyzmq overhead included):")
     print("-" * 60)
     
     for size in [64, 256, 1024, 10240]:
-        results = bench_req_rep_throughput(size, num_messages=10000)
+        results = bench_req_rep_throughput(size, num_messages=10000, ctx=ctx)
+        print(f"\nMessage size: {size} bytes")
+        print(f"  Throughput: {results['throughput']:,.0f} msg/s")
+        print(f"  Latency:    {results['latency_us']:.2f} μs")
+        print(f"  Elapsed:    {results['elapsed']:.3f} s")
+    
+    # The remaining runs have more than one busy thread (local_lat/remote_lat
+    # and their IO threads, or the PUB/SUB producer and consumer) and child
+    # processes inherit our mask, so drop the single-core pin first. The
+    # native baseline then runs unpinned, like Monocoque's own benchmarks.
+    if original_cpus is not None:
+        os.sched_setaffinity(0, original_cpus)
+    
+    # Native libzmq baseline, if its perf tools are available
+    print("\n\nREQ/REP Pattern (native libzmq local_lat/remote_lat):")
+    print("-" * 60)
+    
+    for size in [64, 256, 1024, 10240]:
+        try:
+            results = bench_req_rep_throughput_native(size, num_messages=10000)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, RuntimeError) as exc:
+            print(f"\nlocal_lat/remote_lat failed, skipping native runs: {exc}")
+            break
+        if results is None:
+            print("\nlocal_lat/remote_lat not found; set LIBZMQ_PERF_DIR or add them to PATH")
+            break
         print(f"\nMessage size: {size} bytes")
         print(f"  Throughput: {results['throughput']:,.0f} msg/s")
         print(f"  Latency:    {results['latency_us']:.2f} μs")
@@ -139,7 +338,7 @@ def main():
     print("-" * 60)
     
     for size in [64, 256, 1024]:
-        results = bench_pub_sub_throughput(size, num_messages=100000)
+        results = bench_pub_sub_throughput(size, num_messages=100000, ctx=ctx)
         print(f"\nMessage size: {size} bytes")
         print(f"  Send throughput: {results['send_throughput']:,.0f} msg/s")
         print(f"  Recv throughput: {results['recv_throughput']:,.0f} msg/s")
@@ -149,6 +348,8 @@ def main():
     print(f"ZeroMQ version: {zmq.zmq_version()}")
     print(f"PyZMQ version: {zmq.pyzmq_version()}")
     print("=" * 60)
+    
+    ctx.term()
 
 
 if __name__ == "__main__":